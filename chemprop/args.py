@@ -12,6 +12,9 @@ from chemprop.data import set_cache_mol
 from chemprop.features import get_available_features_generators
 
 
+# Temporary save directories of all TrainArgs created in this process (prevents their deletion before exit)
+TEMP_DIRS: List[TemporaryDirectory] = []
+
 Metric = Literal['auc', 'prc-auc', 'rmse', 'mae', 'mse', 'r2', 'accuracy', 'cross_entropy']
 
 
@@ -83,6 +86,10 @@ class CommonArgs(Tap):
     """Maximum number of data points to load."""
     num_workers: int = 8 
     """Number of workers for the parallel data loading (0 means sequential)."""
+    no_pin_memory: bool = False
+    """Turn off pinning of data batches in page-locked memory (only used with cuda)."""
+    no_persistent_workers: bool = False
+    """Turn off keeping the data loading workers alive between epochs (only used with :code:`num_workers > 0`)."""
     batch_size: int = 50
     """Batch size."""
     atom_descriptors: Literal['feature', 'descriptor'] = None
@@ -120,6 +127,16 @@ class CommonArgs(Tap):
     def cuda(self, cuda: bool) -> None:
         self.no_cuda = not cuda
 
+    @property
+    def pin_memory(self) -> bool:
+        """Whether to pin data batches in page-locked memory so they can be copied to the GPU asynchronously."""
+        return not self.no_pin_memory and self.cuda
+
+    @property
+    def persistent_workers(self) -> bool:
+        """Whether to keep the data loading workers alive between epochs."""
+        return not self.no_persistent_workers
+
     @property
     def features_scaling(self) -> bool:
         """Whether to apply normalization with a :class:`~chemprop.data.scaler.StandardScaler` to the additional molecule-level features."""
@@ -348,8 +365,6 @@ class TrainArgs(CommonArgs):
     def process_args(self) -> None:
         super(TrainArgs, self).process_args()
 
-        global temp_dir  # Prevents the temporary directory from being deleted upon function return
-
         # Load config file
         if self.config_path is not None:
             with open(self.config_path) as f:
@@ -360,8 +375,13 @@ class TrainArgs(CommonArgs):
         # Create temporary directory as save directory if not provided
         if self.save_dir is None:
             temp_dir = TemporaryDirectory()
+            TEMP_DIRS.append(temp_dir)
             self.save_dir = temp_dir.name
 
+        # Use an absolute save directory so that outputs do not depend on the working directory
+        # (e.g., when several trainings are run from the same process)
+        self.save_dir = os.path.abspath(self.save_dir)
+
         # Fix ensemble size if loading checkpoints
         if self.checkpoint_paths is not None and len(self.checkpoint_paths) > 0:
             self.ensemble_size = len(self.checkpoint_paths)
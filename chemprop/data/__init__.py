@@ -1,5 +1,6 @@
 from .data import (
     cache_graph,
+    cache_graphs,
     cache_mol,
     MoleculeDatapoint,
     MoleculeDataset,
@@ -25,6 +26,7 @@ from .utils import (
 
 __all__ = [
     'cache_graph',
+    'cache_graphs',
     'cache_mol',
     'MoleculeDatapoint',
     'MoleculeDataset',
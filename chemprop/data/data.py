@@ -1,15 +1,23 @@
-import threading
 from collections import OrderedDict
+from functools import partial
+from multiprocessing import get_all_start_methods, get_context
+import queue
+import threading
+import weakref
 from random import Random
-from typing import Dict, Iterator, List, Optional, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 import numpy as np
+import torch
 from torch.utils.data import DataLoader, Dataset, Sampler
 from rdkit import Chem
+from tqdm import tqdm
 
 from .scaler import StandardScaler
 from chemprop.features import get_features_generator
-from chemprop.features import BatchMolGraph, MolGraph
+from chemprop.features import BatchMolGraph, get_atom_fdim, MolGraph, set_extra_atom_fdim
+from chemprop.features._collate_numba import warmup_offset_indices
+from chemprop.features.featurization import ATOM_FDIM
 
 
 # Cache of graph featurizations
@@ -76,11 +84,12 @@ class MoleculeDatapoint:
         # Generate additional features if given a generator
         if self.features_generator is not None:
             self.features = []
+            mol = self.mol  # parse the SMILES once for all features generators
 
             for fg in self.features_generator:
                 features_generator = get_features_generator(fg)
-                if self.mol is not None and self.mol.GetNumHeavyAtoms() > 0:
-                    self.features.extend(features_generator(self.mol))
+                if mol is not None and mol.GetNumHeavyAtoms() > 0:
+                    self.features.extend(features_generator(mol))
 
             self.features = np.array(self.features)
 
@@ -103,7 +112,10 @@ class MoleculeDatapoint:
     @property
     def mol(self) -> Chem.Mol:
         """Gets the corresponding RDKit molecule for this molecule's SMILES."""
-        mol = SMILES_TO_MOL.get(self.smiles, Chem.MolFromSmiles(self.smiles))
+        if self.smiles in SMILES_TO_MOL:
+            return SMILES_TO_MOL[self.smiles]
+
+        mol = Chem.MolFromSmiles(self.smiles)
 
         if cache_mol():
             SMILES_TO_MOL[self.smiles] = mol
@@ -149,6 +161,7 @@ class MoleculeDataset(Dataset):
         self._data = data
         self._scaler = None
         self._batch_graph = None
+        self._targets = None
         self._random = Random()
 
     def smiles(self) -> List[str]:
@@ -167,7 +180,7 @@ class MoleculeDataset(Dataset):
         """
         return [d.mol for d in self._data]
 
-    def batch_graph(self) -> BatchMolGraph:
+    def batch_graph(self, pin_memory: bool = False) -> BatchMolGraph:
         r"""
         Constructs a :class:`~chemprop.features.BatchMolGraph` with the graph featurization of all the molecules.
 
@@ -177,6 +190,8 @@ class MoleculeDataset(Dataset):
            set of :class:`MoleculeDatapoint`\ s changes, then the returned :class:`~chemprop.features.BatchMolGraph`
            will be incorrect for the underlying data.
 
+        :param pin_memory: Whether to allocate the tensors of the :class:`~chemprop.features.BatchMolGraph`
+                           in page-locked memory. Only used the first time it is computed.
         :return: A :class:`~chemprop.features.BatchMolGraph` containing the graph featurization of all the molecules.
         """
         if self._batch_graph is None:
@@ -190,10 +205,24 @@ class MoleculeDataset(Dataset):
                         SMILES_TO_GRAPH[d.smiles] = mol_graph
                 mol_graphs.append(mol_graph)
 
-            self._batch_graph = BatchMolGraph(mol_graphs)
+            self._batch_graph = BatchMolGraph(mol_graphs, pin_memory=pin_memory)
 
         return self._batch_graph
 
+    def pin_memory(self) -> 'MoleculeDataset':
+        r"""
+        Pins the tensors of the cached :class:`~chemprop.features.BatchMolGraph` (if computed) in page-locked memory.
+
+        This is called by a :class:`MoleculeDataLoader` with :code:`pin_memory=True` on each batch
+        so that the batch can be copied to the GPU asynchronously.
+
+        :return: The :class:`MoleculeDataset` (self).
+        """
+        if self._batch_graph is not None:
+            self._batch_graph.pin_memory()
+
+        return self
+
     def features(self) -> List[np.ndarray]:
         """
         Returns the features associated with each molecule (if they exist).
@@ -225,6 +254,23 @@ class MoleculeDataset(Dataset):
         """
         return [d.targets for d in self._data]
 
+    def targets_array(self) -> np.ndarray:
+        r"""
+        Returns the targets associated with each molecule as a 2D numpy array.
+
+        .. note::
+           The array is cached after the first time it is computed and is invalidated by :meth:`set_targets`
+           and :meth:`reset_features_and_targets`. If the targets of the underlying :class:`MoleculeDatapoint`\ s
+           are changed in any other way, then the returned array will be incorrect for the underlying data.
+
+        :return: A numpy array of shape :code:`(num_molecules, num_tasks)` containing the targets, with NaN
+                 in place of unknown target values.
+        """
+        if self._targets is None:
+            self._targets = np.array([d.targets for d in self._data], dtype=float).reshape(len(self._data), self.num_tasks() or 0)
+
+        return self._targets
+
     def num_tasks(self) -> int:
         """
         Returns the number of prediction tasks.
@@ -305,10 +351,11 @@ class MoleculeDataset(Dataset):
 
         :return: A :class:`~chemprop.data.StandardScaler` fitted to the targets.
         """
-        targets = [d.raw_targets for d in self._data]
+        targets = np.array([d.raw_targets for d in self._data], dtype=float).reshape(len(self._data), self.num_tasks() or 0)
         scaler = StandardScaler().fit(targets)
-        scaled_targets = scaler.transform(targets).tolist()
-        self.set_targets(scaled_targets)
+        scaled_targets = scaler.transform(targets)  # unknown targets are None
+        self.set_targets(scaled_targets.tolist())
+        self._targets = scaled_targets.astype(float)  # the scaled target matrix is already computed, so cache it
 
         return scaler
 
@@ -322,11 +369,13 @@ class MoleculeDataset(Dataset):
         assert len(self._data) == len(targets)
         for i in range(len(self._data)):
             self._data[i].set_targets(targets[i])
+        self._targets = None
 
     def reset_features_and_targets(self) -> None:
         """Resets the features and targets to their raw values."""
         for d in self._data:
             d.reset_features_and_targets()
+        self._targets = None
 
     def __len__(self) -> int:
         """
@@ -347,6 +396,75 @@ class MoleculeDataset(Dataset):
         return self._data[item]
 
 
+# Minimum number of items for which map_in_processes uses a process pool (below, process startup dominates)
+POOL_MIN_SIZE = 5000
+
+
+def map_in_processes(func: Callable[[Any], Any],
+                     items: List[Any],
+                     num_workers: int = 0,
+                     min_size: int = POOL_MIN_SIZE,
+                     progress_bar: bool = False) -> List[Any]:
+    """
+    Applies a function to each item, distributing the items over a pool of processes when it pays off.
+
+    The processes are started with forkserver (or spawn) rather than fork since the calling process may already
+    have initialized CUDA or started threads (e.g., the prefetch threads of a :class:`MoleculeDataLoader`).
+    The items are mapped sequentially in the calling process if :code:`num_workers` is 0, if there are fewer than
+    :code:`min_size` items, or if not called from the main thread.
+
+    :param func: A picklable (i.e., module-level) function which takes a single item.
+    :param items: A list of items to which :code:`func` is applied.
+    :param num_workers: Number of processes in the pool.
+    :param min_size: Minimum number of items for which a pool is used.
+    :param progress_bar: Whether to display a progress bar.
+    :return: A list with the result of :code:`func` for each item, in the same order as :code:`items`.
+    """
+    if num_workers > 0 and len(items) >= min_size and threading.current_thread() is threading.main_thread():
+        context = get_context('forkserver' if 'forkserver' in get_all_start_methods() else 'spawn')
+        # The children do not inherit the featurization settings of this process, so pass them explicitly
+        with context.Pool(num_workers, initializer=set_extra_atom_fdim, initargs=(get_atom_fdim() - ATOM_FDIM,)) as pool:
+            chunksize = max(1, len(items) // (4 * num_workers))
+            return list(tqdm(pool.imap(func, items, chunksize=chunksize), total=len(items), disable=not progress_bar))
+
+    return [func(item) for item in tqdm(items, disable=not progress_bar)]
+
+
+def _construct_mol_graph(smiles_and_atom_features: Tuple[str, np.ndarray]) -> MolGraph:
+    """
+    Constructs a :class:`~chemprop.features.MolGraph` from a SMILES and its atom features (picklable for a pool).
+
+    :param smiles_and_atom_features: A tuple of a SMILES string and its atom features (or None).
+    :return: The constructed :class:`~chemprop.features.MolGraph`.
+    """
+    return MolGraph(*smiles_and_atom_features)
+
+
+def cache_graphs(datasets: List[MoleculeDataset], num_workers: int = 0) -> None:
+    r"""
+    Computes the :class:`~chemprop.features.MolGraph` of each molecule in the datasets which is not yet cached
+    and caches it.
+
+    Featurization is distributed over :code:`num_workers` processes (see :func:`map_in_processes`), so that it does
+    not happen sequentially in the main process when :meth:`MoleculeDataset.batch_graph` is first called for each
+    batch. Does nothing if graph caching is disabled (see :func:`set_cache_graph`).
+
+    :param datasets: A list of :class:`MoleculeDataset`\ s whose molecules are featurized together.
+    :param num_workers: Number of processes used to featurize the molecules. Featurizes sequentially if 0
+                        or if there are fewer than :code:`POOL_MIN_SIZE` molecules to featurize.
+    """
+    if not cache_graph():
+        return
+
+    # Deduplicate by SMILES since the cache is keyed by SMILES
+    uncached = list({d.smiles: d.atom_features for dataset in datasets for d in dataset
+                     if d.smiles not in SMILES_TO_GRAPH}.items())
+    mol_graphs = map_in_processes(_construct_mol_graph, uncached, num_workers=num_workers)
+
+    for (smiles, _), mol_graph in zip(uncached, mol_graphs):
+        SMILES_TO_GRAPH[smiles] = mol_graph
+
+
 class MoleculeSampler(Sampler):
     """A :class:`MoleculeSampler` samples data from a :class:`MoleculeDataset` for a :class:`MoleculeDataLoader`."""
 
@@ -404,7 +522,7 @@ class MoleculeSampler(Sampler):
         return self.length
 
 
-def construct_molecule_batch(data: List[MoleculeDatapoint]) -> MoleculeDataset:
+def construct_molecule_batch(data: List[MoleculeDatapoint], pin_memory: bool = False) -> MoleculeDataset:
     r"""
     Constructs a :class:`MoleculeDataset` from a list of :class:`MoleculeDatapoint`\ s.
 
@@ -412,14 +530,113 @@ def construct_molecule_batch(data: List[MoleculeDatapoint]) -> MoleculeDataset:
     :class:`MoleculeDataset`.
 
     :param data: A list of :class:`MoleculeDatapoint`\ s.
+    :param pin_memory: Whether to build the :class:`~chemprop.features.BatchMolGraph` in page-locked memory.
     :return: A :class:`MoleculeDataset` containing all the :class:`MoleculeDatapoint`\ s.
     """
     data = MoleculeDataset(data)
-    data.batch_graph()  # Forces computation and caching of the BatchMolGraph for the molecules
+    data.batch_graph(pin_memory=pin_memory)  # Forces computation and caching of the BatchMolGraph for the molecules
 
     return data
 
 
+class _PrefetchIterator:
+    r"""
+    A :class:`_PrefetchIterator` consumes a :class:`MoleculeDataLoader` iterator in a background thread.
+
+    Up to :code:`num_prefetch` batches are built ahead of time and their :class:`~chemprop.features.BatchMolGraph`\ s
+    are copied to :code:`device`. On CUDA devices, the copies are issued on a separate stream so that they overlap
+    with the computation on the current stream.
+    """
+
+    _END = object()  # sentinel marking the end of the underlying iterator
+
+    def __init__(self, iterator: Iterator[MoleculeDataset], device: torch.device, num_prefetch: int = 4):
+        """
+        :param iterator: An iterator over batches of a :class:`MoleculeDataLoader`.
+        :param device: The device to which the batches are moved.
+        :param num_prefetch: The maximum number of batches prepared ahead of time.
+        """
+        self._device = device
+        self._stream = torch.cuda.Stream(device) if device.type == 'cuda' else None
+        self._queue = queue.Queue(maxsize=num_prefetch)
+        self._stopped = threading.Event()
+        self._done = False
+        # The thread does not reference self so that the iterator can be garbage collected (and closed) early
+        self._thread = threading.Thread(target=self._prefetch, daemon=True,
+                                        args=(iterator, device, self._stream, self._queue, self._stopped))
+        self._thread.start()
+
+    @staticmethod
+    def _prefetch(iterator: Iterator[MoleculeDataset],
+                  device: torch.device,
+                  stream: Optional[torch.cuda.Stream],
+                  batch_queue: queue.Queue,
+                  stopped: threading.Event) -> None:
+        """Builds batches and moves them to the device until the iterator is exhausted or the prefetching is stopped."""
+        def put(item) -> bool:
+            while not stopped.is_set():
+                try:
+                    batch_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+
+            return False
+
+        try:
+            for batch in iterator:
+                event = None
+                if stream is not None:
+                    with torch.cuda.stream(stream):
+                        batch.batch_graph().to(device, non_blocking=True)
+                        event = torch.cuda.Event()
+                        event.record(stream)
+                else:
+                    batch.batch_graph().to(device)
+
+                if not put((batch, event)):
+                    return
+
+            put(_PrefetchIterator._END)
+        except Exception as e:
+            put(e)
+
+    def __iter__(self) -> '_PrefetchIterator':
+        return self
+
+    def __next__(self) -> MoleculeDataset:
+        if self._done or self._stopped.is_set():  # a closed iterator yields no more batches
+            raise StopIteration
+
+        item = self._queue.get()
+
+        if item is self._END or isinstance(item, Exception):
+            self._done = True
+
+            if item is self._END:
+                raise StopIteration
+
+            raise item
+
+        batch, event = item
+
+        # Wait for the copy to finish before the batch is used on the current stream
+        if event is not None:
+            stream = torch.cuda.current_stream(self._device)
+            stream.wait_event(event)
+            batch.batch_graph().record_stream(stream)
+
+        return batch
+
+    def close(self) -> None:
+        """Stops the background thread and waits for it to finish using the underlying iterator."""
+        self._stopped.set()
+        self._thread.join()
+
+    def __del__(self) -> None:
+        self._stopped.set()  # Does not wait for the thread so that garbage collection never blocks
+
+
 class MoleculeDataLoader(DataLoader):
     """A :class:`MoleculeDataLoader` is a PyTorch :class:`DataLoader` for loading a :class:`MoleculeDataset`."""
 
@@ -429,7 +646,10 @@ class MoleculeDataLoader(DataLoader):
                  num_workers: int = 8,
                  class_balance: bool = False,
                  shuffle: bool = False,
-                 seed: int = 0):
+                 seed: int = 0,
+                 pin_memory: bool = True,
+                 persistent_workers: bool = None,
+                 prefetch_to_device: torch.device = None):
         """
         :param dataset: The :class:`MoleculeDataset` containing the molecules to load.
         :param batch_size: Batch size.
@@ -440,6 +660,12 @@ class MoleculeDataLoader(DataLoader):
                               subset of the larger class.
         :param shuffle: Whether to shuffle the data.
         :param seed: Random seed. Only needed if shuffle is True.
+        :param pin_memory: Whether to copy batches into page-locked memory so that they can be transferred
+                           to the GPU asynchronously. Only used if CUDA is available.
+        :param persistent_workers: Whether to keep the worker processes alive between iterations through the data
+                                   rather than restarting them every epoch. Defaults to True if :code:`num_workers > 0`.
+        :param prefetch_to_device: If provided, batches are built and moved to this device in a background thread
+                                   while the previous batch is being used.
         """
         self._dataset = dataset
         self._batch_size = batch_size
@@ -447,6 +673,10 @@ class MoleculeDataLoader(DataLoader):
         self._class_balance = class_balance
         self._shuffle = shuffle
         self._seed = seed
+        self._pin_memory = pin_memory and torch.cuda.is_available()
+        self._persistent_workers = (persistent_workers is None or persistent_workers) and self._num_workers > 0
+        self._prefetch_to_device = prefetch_to_device
+        self._prefetch_iterator = None  # weak reference to the most recent _PrefetchIterator
         self._context = None
         self._timeout = 0
         is_main_thread = threading.current_thread() is threading.main_thread()
@@ -461,14 +691,24 @@ class MoleculeDataLoader(DataLoader):
             seed=self._seed
         )
 
+        # Without shuffling or class balancing, the order of the sampled indices is fixed so it can be cached
+        if self._class_balance or self._shuffle:
+            self._indices = None
+        else:
+            self._indices = np.fromiter(self._sampler, dtype=np.int64, count=len(self._sampler))
+
         super(MoleculeDataLoader, self).__init__(
             dataset=self._dataset,
             batch_size=self._batch_size,
             sampler=self._sampler,
             num_workers=self._num_workers,
-            collate_fn=construct_molecule_batch,
+            # Batches built in the main process are allocated pinned directly (worker batches are pinned after transfer)
+            collate_fn=partial(construct_molecule_batch, pin_memory=self._pin_memory and self._num_workers == 0),
+            pin_memory=self._pin_memory,
+            worker_init_fn=warmup_offset_indices,  # Compiles the batching kernel before the first batch
             multiprocessing_context=self._context,
-            timeout=self._timeout
+            timeout=self._timeout,
+            persistent_workers=self._persistent_workers
         )
 
     @property
@@ -478,10 +718,22 @@ class MoleculeDataLoader(DataLoader):
 
         :return: A list of lists of floats (or None) containing the targets.
         """
-        if self._class_balance or self._shuffle:
+        targets = self.targets_array
+
+        return np.where(np.isnan(targets), None, targets).tolist()
+
+    @property
+    def targets_array(self) -> np.ndarray:
+        """
+        Returns the targets associated with each molecule as a 2D numpy array (in the order they are loaded).
+
+        :return: A numpy array of shape :code:`(num_molecules, num_tasks)` containing the targets, with NaN
+                 in place of unknown target values.
+        """
+        if self._indices is None:
             raise ValueError('Cannot safely extract targets when class balance or shuffle are enabled.')
 
-        return [self._dataset[index].targets for index in self._sampler]
+        return self._dataset.targets_array()[self._indices]
 
     @property
     def iter_size(self) -> int:
@@ -490,4 +742,16 @@ class MoleculeDataLoader(DataLoader):
 
     def __iter__(self) -> Iterator[MoleculeDataset]:
         r"""Creates an iterator which returns :class:`MoleculeDataset`\ s"""
-        return super(MoleculeDataLoader, self).__iter__()
+        # With persistent workers, the underlying iterator is reset and reused by every call to __iter__,
+        # so a previous prefetch thread which is still alive (e.g., after an early break) must be stopped first
+        prefetch_iterator = self._prefetch_iterator() if self._prefetch_iterator is not None else None
+        if prefetch_iterator is not None:
+            prefetch_iterator.close()
+
+        iterator = super(MoleculeDataLoader, self).__iter__()
+
+        if self._prefetch_to_device is not None:
+            iterator = _PrefetchIterator(iterator, device=self._prefetch_to_device)
+            self._prefetch_iterator = weakref.ref(iterator)
+
+        return iterator
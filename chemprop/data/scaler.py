@@ -27,7 +27,7 @@ class StandardScaler:
         :param X: A list of lists of floats (or None).
         :return: The fitted :class:`StandardScaler` (self).
         """
-        X = np.array(X).astype(float)
+        X = np.asarray(X, dtype=float)  # None --> NaN, without copying arrays that are already float
         self.means = np.nanmean(X, axis=0)
         self.stds = np.nanstd(X, axis=0)
         self.means = np.where(np.isnan(self.means), np.zeros(self.means.shape), self.means)
@@ -43,7 +43,7 @@ class StandardScaler:
         :param X: A list of lists of floats (or None).
         :return: The transformed data with NaNs replaced by :code:`self.replace_nan_token`.
         """
-        X = np.array(X).astype(float)
+        X = np.asarray(X, dtype=float)
         transformed_with_nan = (X - self.means) / self.stds
         transformed_with_none = np.where(np.isnan(transformed_with_nan), self.replace_nan_token, transformed_with_nan)
 
@@ -56,7 +56,7 @@ class StandardScaler:
         :param X: A list of lists of floats.
         :return: The inverse transformed data with NaNs replaced by :code:`self.replace_nan_token`.
         """
-        X = np.array(X).astype(float)
+        X = np.asarray(X, dtype=float)
         transformed_with_nan = X * self.stds + self.means
         transformed_with_none = np.where(np.isnan(transformed_with_nan), self.replace_nan_token, transformed_with_nan)
 
@@ -3,14 +3,14 @@ import csv
 from logging import Logger
 import pickle
 from random import Random
-from typing import List, Set, Tuple, Union
+from typing import Any, Dict, List, Set, Tuple, Union
 import os
 
 from rdkit import Chem
 import numpy as np
 from tqdm import tqdm
 
-from .data import MoleculeDatapoint, MoleculeDataset
+from .data import cache_mol, map_in_processes, MoleculeDatapoint, MoleculeDataset, SMILES_TO_MOL
 from .scaffold import log_scaffold_stats, scaffold_split
 from chemprop.args import PredictArgs, TrainArgs
 from chemprop.features import load_features, load_atom_features
@@ -101,6 +101,19 @@ def filter_invalid_smiles(data: MoleculeDataset) -> MoleculeDataset:
                             and datapoint.mol.GetNumHeavyAtoms() > 0])
 
 
+def _construct_datapoint(kwargs: Dict[str, Any]) -> Tuple[MoleculeDatapoint, Chem.Mol]:
+    """
+    Constructs a :class:`~chemprop.data.MoleculeDatapoint` from keyword arguments (picklable for a pool).
+
+    :param kwargs: Keyword arguments for :class:`~chemprop.data.MoleculeDatapoint`.
+    :return: A tuple of the constructed :class:`~chemprop.data.MoleculeDatapoint` and its parsed RDKit molecule,
+             which is returned so that a parent process can cache it rather than parse the SMILES again.
+    """
+    datapoint = MoleculeDatapoint(**kwargs)
+
+    return datapoint, datapoint.mol
+
+
 def get_data(path: str,
              smiles_column: str = None,
              target_columns: List[str] = None,
@@ -113,7 +126,8 @@ def get_data(path: str,
              max_data_size: int = None,
              store_row: bool = False,
              logger: Logger = None,
-             skip_none_targets: bool = False) -> MoleculeDataset:
+             skip_none_targets: bool = False,
+             num_workers: int = None) -> MoleculeDataset:
     """
     Gets SMILES and target values from a CSV file.
 
@@ -134,6 +148,9 @@ def get_data(path: str,
     :param store_row: Whether to store the raw CSV row in each :class:`~chemprop.data.data.MoleculeDatapoint`.
     :param skip_none_targets: Whether to skip targets that are all 'None'. This is mostly relevant when --target_columns
                               are passed in, so only a subset of tasks are examined.
+    :param num_workers: Number of processes used to run the :code:`features_generator` over the molecules
+                        (see :func:`~chemprop.data.data.map_in_processes`).
+                        If provided, it is used in place of :code:`args.num_workers`.
     :return: A :class:`~chemprop.data.MoleculeDataset` containing SMILES and target values along
              with other info such as additional features when desired.
     """
@@ -153,6 +170,7 @@ def get_data(path: str,
         atom_descriptors_path = atom_descriptors_path if atom_descriptors_path is not None \
             else args.atom_descriptors_path
         max_data_size = max_data_size if max_data_size is not None else args.max_data_size
+        num_workers = num_workers if num_workers is not None else args.num_workers
 
         if args.atom_descriptors == 'feature':
             atom_features = load_atom_features(atom_descriptors_path)
@@ -174,8 +192,8 @@ def get_data(path: str,
 
     # Load data
     with open(path) as f:
-        reader = csv.DictReader(f)
-        columns = reader.fieldnames
+        reader = csv.reader(f)
+        columns = next(reader)
 
         # By default, the SMILES column is the first column
         if smiles_column is None:
@@ -186,14 +204,18 @@ def get_data(path: str,
             ignore_columns = set([smiles_column] + ([] if ignore_columns is None else ignore_columns))
             target_columns = [column for column in columns if column not in ignore_columns]
 
+        # Only the SMILES and target columns are parsed (a dict of the full row is only built if it is stored)
+        smiles_index = columns.index(smiles_column)
+        target_indices = [columns.index(column) for column in target_columns]
+
         all_smiles, all_targets, all_rows, all_features = [], [], [], []
-        for i, row in tqdm(enumerate(reader)):
-            smiles = row[smiles_column]
+        for i, values in tqdm(enumerate(values for values in reader if values)):  # skip blank lines like DictReader
+            smiles = values[smiles_index]
 
             if smiles in skip_smiles:
                 continue
 
-            targets = [float(row[column]) if row[column] != '' else None for column in target_columns]
+            targets = [float(values[index]) if values[index] != '' else None for index in target_indices]
 
             # Check whether all targets are None and skip if so
             if skip_none_targets and all(x is None for x in targets):
@@ -206,13 +228,13 @@ def get_data(path: str,
                 all_features.append(features_data[i])
 
             if store_row:
-                all_rows.append(row)
+                all_rows.append(OrderedDict(zip(columns, values)))
 
             if len(all_smiles) >= max_data_size:
                 break
 
-        data = MoleculeDataset([
-            MoleculeDatapoint(
+        datapoint_kwargs = [
+            dict(
                 smiles=smiles,
                 targets=targets,
                 row=all_rows[i] if store_row else None,
@@ -220,9 +242,20 @@ def get_data(path: str,
                 features=all_features[i] if features_data is not None else None,
                 atom_features=atom_features[i] if atom_features is not None else None,
                 atom_descriptors=atom_descriptors[i] if atom_descriptors is not None else None,
-            ) for i, (smiles, targets) in tqdm(enumerate(zip(all_smiles, all_targets)),
-                                               total=len(all_smiles))
-        ])
+            ) for i, (smiles, targets) in enumerate(zip(all_smiles, all_targets))
+        ]
+
+        # Features generators run RDKit per molecule while holding the GIL, so they are parallelized over processes
+        datapoints_and_mols = map_in_processes(_construct_datapoint, datapoint_kwargs,
+                                               num_workers=(num_workers or 0) if features_generator is not None else 0,
+                                               progress_bar=True)
+
+        # Molecules parsed in a pool were only cached in its processes
+        if cache_mol():
+            for datapoint, mol in datapoints_and_mols:
+                SMILES_TO_MOL.setdefault(datapoint.smiles, mol)
+
+        data = MoleculeDataset([datapoint for datapoint, _ in datapoints_and_mols])
 
     # Filter out invalid SMILES
     if skip_invalid_smiles:
@@ -0,0 +1,81 @@
+r"""
+Kernel which shifts the per-molecule graph indices of a batch of :class:`~chemprop.features.MolGraph`\ s
+to indices into the :class:`~chemprop.features.BatchMolGraph`.
+
+If `numba <https://numba.pydata.org/>`_ is installed, the kernel is compiled to native code (and cached on disk).
+Otherwise, an equivalent vectorized NumPy implementation is used. :func:`offset_indices` is the implementation in use,
+while :func:`offset_indices_numpy` and :func:`offset_indices_numba` (None without numba) are both exposed for testing.
+"""
+import numpy as np
+
+
+def offset_indices_numpy(a2b: np.ndarray,
+                         degrees: np.ndarray,
+                         b2a: np.ndarray,
+                         b2revb: np.ndarray,
+                         mol_n_atoms: np.ndarray,
+                         mol_n_bonds: np.ndarray) -> None:
+    """
+    Adds the start atom/bond index of each molecule to the atom/bond indices of that molecule (in place).
+
+    All arrays include the zero padding atom/bond at index 0, which is left untouched.
+
+    :param a2b: An array of shape :code:`(n_atoms, max_num_bonds)` mapping each atom to its incoming bond indices.
+    :param degrees: An array of shape :code:`(n_atoms,)` with the number of incoming bonds of each atom.
+                    Entries of :code:`a2b` beyond the degree of an atom are padding and are not shifted.
+    :param b2a: An array of shape :code:`(n_bonds,)` mapping each bond to the atom it originates from.
+    :param b2revb: An array of shape :code:`(n_bonds,)` mapping each bond to its reverse bond.
+    :param mol_n_atoms: An array with the number of atoms in each molecule.
+    :param mol_n_bonds: An array with the number of bonds in each molecule.
+    """
+    atom_offsets = 1 + np.cumsum(mol_n_atoms) - mol_n_atoms  # start atom index of each molecule
+    bond_offsets = 1 + np.cumsum(mol_n_bonds) - mol_n_bonds  # start bond index of each molecule
+
+    a2b[1:] += np.repeat(bond_offsets, mol_n_atoms)[:, None] * (np.arange(a2b.shape[1]) < degrees[1:, None])
+    b2a[1:] += np.repeat(atom_offsets, mol_n_bonds)
+    b2revb[1:] += np.repeat(bond_offsets, mol_n_bonds)
+
+
+offset_indices = offset_indices_numpy
+offset_indices_numba = None
+
+try:
+    from numba import njit
+
+    @njit(cache=True, boundscheck=False)
+    def offset_indices_numba(a2b: np.ndarray,
+                             degrees: np.ndarray,
+                             b2a: np.ndarray,
+                             b2revb: np.ndarray,
+                             mol_n_atoms: np.ndarray,
+                             mol_n_bonds: np.ndarray) -> None:
+        """Numba implementation of :func:`offset_indices_numpy`."""
+        atom_offset, bond_offset = 1, 1
+        for i in range(len(mol_n_atoms)):
+            for a in range(atom_offset, atom_offset + mol_n_atoms[i]):
+                for k in range(degrees[a]):
+                    a2b[a, k] += bond_offset
+
+            for b in range(bond_offset, bond_offset + mol_n_bonds[i]):
+                b2a[b] += atom_offset
+                b2revb[b] += bond_offset
+
+            atom_offset += mol_n_atoms[i]
+            bond_offset += mol_n_bonds[i]
+
+    offset_indices = offset_indices_numba
+except ImportError:
+    pass
+
+
+def warmup_offset_indices(worker_id: int = 0) -> None:
+    """
+    Calls :func:`offset_indices` on an empty batch so that it is compiled (or loaded from the cache) ahead of time.
+
+    The signature allows this to be used directly as the :code:`worker_init_fn` of a PyTorch :class:`DataLoader`.
+
+    :param worker_id: The id of the DataLoader worker (unused).
+    """
+    offset_indices(np.zeros((1, 1), dtype=np.int32), np.zeros(1, dtype=np.int32),
+                   np.zeros(1, dtype=np.int32), np.zeros(1, dtype=np.int32),
+                   np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
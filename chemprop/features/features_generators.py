@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import Callable, List, Union
 
 import numpy as np
@@ -106,6 +107,17 @@ def rdkit_2d_normalized_features_generator(mol: Molecule) -> np.ndarray:
 try:
     from descriptastorus.descriptors import rdDescriptors, rdNormalizedDescriptors
 
+    # Building a descriptor generator is expensive, so each one is built once on first use (not at import)
+    @lru_cache(maxsize=None)
+    def _rdkit_2d_generator() -> rdDescriptors.RDKit2D:
+        """Returns the (cached) descriptastorus RDKit 2D descriptor generator."""
+        return rdDescriptors.RDKit2D()
+
+    @lru_cache(maxsize=None)
+    def _rdkit_2d_normalized_generator() -> rdNormalizedDescriptors.RDKit2DNormalized:
+        """Returns the (cached) descriptastorus RDKit 2D normalized descriptor generator."""
+        return rdNormalizedDescriptors.RDKit2DNormalized()
+
     @register_features_generator('rdkit_2d')
     def rdkit_2d_features_generator(mol: Molecule) -> np.ndarray:
         """
@@ -115,8 +127,7 @@ try:
         :return: A 1D numpy array containing the RDKit 2D features.
         """
         smiles = Chem.MolToSmiles(mol, isomericSmiles=True) if type(mol) != str else mol
-        generator = rdDescriptors.RDKit2D()
-        features = generator.process(smiles)[1:]
+        features = _rdkit_2d_generator().process(smiles)[1:]
 
         return features
 
@@ -129,8 +140,7 @@ try:
         :return: A 1D numpy array containing the RDKit 2D normalized features.
         """
         smiles = Chem.MolToSmiles(mol, isomericSmiles=True) if type(mol) != str else mol
-        generator = rdNormalizedDescriptors.RDKit2DNormalized()
-        features = generator.process(smiles)[1:]
+        features = _rdkit_2d_normalized_generator().process(smiles)[1:]
 
         return features
 except ImportError:
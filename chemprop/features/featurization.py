@@ -1,9 +1,12 @@
+from itertools import chain
 from typing import List, Tuple, Union
 
 from rdkit import Chem
 import torch
 import numpy as np
 
+from ._collate_numba import offset_indices
+
 # Atom feature sizes
 MAX_ATOMIC_NUM = 100
 ATOM_FEATURES = {
@@ -125,11 +128,16 @@ class MolGraph:
 
     * :code:`n_atoms`: The number of atoms in the molecule.
     * :code:`n_bonds`: The number of bonds in the molecule.
-    * :code:`f_atoms`: A mapping from an atom index to a list of atom features.
-    * :code:`f_bonds`: A mapping from a bond index to a list of bond features.
-    * :code:`a2b`: A mapping from an atom index to a list of incoming bond indices.
+    * :code:`f_atoms`: A float32 array of shape :code:`(n_atoms, atom_fdim)` with the features of each atom.
+    * :code:`f_bonds`: A float32 array of shape :code:`(n_bonds, bond_fdim)` with the features of each bond.
+    * :code:`a2b`: A mapping from an atom index to its incoming bond indices, stored as an int32 array of shape
+      :code:`(n_atoms, max_degree)` where each row is right-padded with zeros beyond :code:`degrees[atom]`.
+    * :code:`degrees`: A mapping from an atom index to its number of incoming bonds.
     * :code:`b2a`: A mapping from a bond index to the index of the atom the bond originates from.
     * :code:`b2revb`: A mapping from a bond index to the index of the reverse bond.
+
+    The attributes are stored as NumPy arrays, which are built once at featurization time, so that
+    :class:`BatchMolGraph` only needs to concatenate them.
     """
 
     def __init__(self, mol: Union[str, Chem.Mol], atom_descriptors: np.ndarray = None):
@@ -182,6 +190,17 @@ class MolGraph:
                 self.b2revb.append(b1)
                 self.n_bonds += 2
 
+        # Convert the featurization to contiguous arrays
+        atom_fdim = len(self.f_atoms[0]) if self.n_atoms > 0 else get_atom_fdim()
+        self.f_atoms = np.array(self.f_atoms, dtype=np.float32).reshape(self.n_atoms, atom_fdim)
+        self.f_bonds = np.array(self.f_bonds, dtype=np.float32).reshape(self.n_bonds, atom_fdim + BOND_FDIM)
+        self.degrees = np.array([len(in_bonds) for in_bonds in self.a2b], dtype=np.int32)
+        a2b = np.zeros((self.n_atoms, self.degrees.max(initial=0)), dtype=np.int32)
+        a2b[np.arange(a2b.shape[1]) < self.degrees[:, None]] = list(chain.from_iterable(self.a2b))
+        self.a2b = a2b
+        self.b2a = np.array(self.b2a, dtype=np.int32)
+        self.b2revb = np.array(self.b2revb, dtype=np.int32)
+
 
 class BatchMolGraph:
     """
@@ -198,53 +217,57 @@ class BatchMolGraph:
     * :code:`a2a`: (Optional): A mapping from an atom index to neighboring atom indices.
     """
 
-    def __init__(self, mol_graphs: List[MolGraph]):
+    def __init__(self, mol_graphs: List[MolGraph], pin_memory: bool = False):
         r"""
         :param mol_graphs: A list of :class:`MolGraph`\ s from which to construct the :class:`BatchMolGraph`.
+        :param pin_memory: Whether to allocate the tensors directly in page-locked memory (requires CUDA),
+                           which avoids a separate copy when they are pinned for asynchronous GPU transfers.
         """
         self.atom_fdim = get_atom_fdim()
         self.bond_fdim = get_bond_fdim()
 
+        mol_n_atoms = np.array([mol_graph.n_atoms for mol_graph in mol_graphs], dtype=np.int64)
+        mol_n_bonds = np.array([mol_graph.n_bonds for mol_graph in mol_graphs], dtype=np.int64)
+
         # Start n_atoms and n_bonds at 1 b/c zero padding
-        self.n_atoms = 1  # number of atoms (start at 1 b/c need index 0 as padding)
-        self.n_bonds = 1  # number of bonds (start at 1 b/c need index 0 as padding)
-        self.a_scope = []  # list of tuples indicating (start_atom_index, num_atoms) for each molecule
-        self.b_scope = []  # list of tuples indicating (start_bond_index, num_bonds) for each molecule
+        self.n_atoms = 1 + int(mol_n_atoms.sum())  # number of atoms (start at 1 b/c need index 0 as padding)
+        self.n_bonds = 1 + int(mol_n_bonds.sum())  # number of bonds (start at 1 b/c need index 0 as padding)
+        atom_starts = 1 + np.cumsum(mol_n_atoms) - mol_n_atoms
+        bond_starts = 1 + np.cumsum(mol_n_bonds) - mol_n_bonds
+        self.a_scope = list(zip(atom_starts.tolist(), mol_n_atoms.tolist()))  # list of tuples indicating (start_atom_index, num_atoms) for each molecule
+        self.b_scope = list(zip(bond_starts.tolist(), mol_n_bonds.tolist()))  # list of tuples indicating (start_bond_index, num_bonds) for each molecule
+        self.max_num_bonds = max([1] + [mol_graph.a2b.shape[1] for mol_graph in mol_graphs])  # max with 1 to fix a crash in rare case of all single-heavy-atom mols
 
         # All start with zero padding so that indexing with zero padding returns zeros
-        f_atoms = [[0] * self.atom_fdim]  # atom features
-        f_bonds = [[0] * self.bond_fdim]  # combined atom/bond features
-        a2b = [[]]  # mapping from atom index to incoming bond indices
-        b2a = [0]  # mapping from bond index to the index of the atom the bond is coming from
-        b2revb = [0]  # mapping from bond index to the index of the reverse bond
-        for mol_graph in mol_graphs:
-            f_atoms.extend(mol_graph.f_atoms)
-            f_bonds.extend(mol_graph.f_bonds)
-
-            for a in range(mol_graph.n_atoms):
-                a2b.append([b + self.n_bonds for b in mol_graph.a2b[a]])
-
-            for b in range(mol_graph.n_bonds):
-                b2a.append(self.n_atoms + mol_graph.b2a[b])
-                b2revb.append(self.n_bonds + mol_graph.b2revb[b])
-
-            self.a_scope.append((self.n_atoms, mol_graph.n_atoms))
-            self.b_scope.append((self.n_bonds, mol_graph.n_bonds))
-            self.n_atoms += mol_graph.n_atoms
-            self.n_bonds += mol_graph.n_bonds
-
-        self.max_num_bonds = max(1, max(len(in_bonds) for in_bonds in a2b))  # max with 1 to fix a crash in rare case of all single-heavy-atom mols
-
-        self.f_atoms = torch.FloatTensor(f_atoms)
-        self.f_bonds = torch.FloatTensor(f_bonds)
-        self.a2b = torch.LongTensor([a2b[a] + [0] * (self.max_num_bonds - len(a2b[a])) for a in range(self.n_atoms)])
-        self.b2a = torch.LongTensor(b2a)
-        self.b2revb = torch.LongTensor(b2revb)
+        # Features and indices are written directly into the memory of the final tensors to avoid intermediate copies
+        self.f_atoms = torch.empty((self.n_atoms, self.atom_fdim), dtype=torch.float32, pin_memory=pin_memory)  # atom features
+        self.f_bonds = torch.empty((self.n_bonds, self.bond_fdim), dtype=torch.float32, pin_memory=pin_memory)  # combined atom/bond features
+        self.f_atoms[0] = 0
+        self.f_bonds[0] = 0
+        np.concatenate([np.zeros((0, self.atom_fdim), dtype=np.float32)] +
+                       [mol_graph.f_atoms for mol_graph in mol_graphs], out=self.f_atoms.numpy()[1:])
+        np.concatenate([np.zeros((0, self.bond_fdim), dtype=np.float32)] +
+                       [mol_graph.f_bonds for mol_graph in mol_graphs], out=self.f_bonds.numpy()[1:])
+
+        # Indices are stored as int32 to halve their size in host memory and in transfers to the GPU
+        self.a2b = torch.zeros((self.n_atoms, self.max_num_bonds), dtype=torch.int32, pin_memory=pin_memory)  # mapping from atom index to incoming bond indices
+        self.b2a = torch.zeros(self.n_bonds, dtype=torch.int32, pin_memory=pin_memory)  # mapping from bond index to the index of the atom the bond is coming from
+        self.b2revb = torch.zeros(self.n_bonds, dtype=torch.int32, pin_memory=pin_memory)  # mapping from bond index to the index of the reverse bond
+        a2b, b2a, b2revb = self.a2b.numpy(), self.b2a.numpy(), self.b2revb.numpy()
+        for mol_graph, a_start in zip(mol_graphs, atom_starts.tolist()):
+            a2b[a_start:a_start + mol_graph.n_atoms, :mol_graph.a2b.shape[1]] = mol_graph.a2b
+        np.concatenate([np.zeros(0, dtype=np.int32)] + [mol_graph.b2a for mol_graph in mol_graphs], out=b2a[1:])
+        np.concatenate([np.zeros(0, dtype=np.int32)] + [mol_graph.b2revb for mol_graph in mol_graphs], out=b2revb[1:])
+        degrees = np.concatenate([np.zeros(1, dtype=np.int32)] + [mol_graph.degrees for mol_graph in mol_graphs])
+
+        # Shift the per-molecule atom and bond indices by the start index of the molecule they belong to
+        offset_indices(a2b, degrees, b2a, b2revb, mol_n_atoms, mol_n_bonds)
+
         self.b2b = None  # try to avoid computing b2b b/c O(n_atoms^3)
         self.a2a = None  # only needed if using atom messages
 
     def get_components(self, atom_messages: bool = False) -> Tuple[torch.FloatTensor, torch.FloatTensor,
-                                                                   torch.LongTensor, torch.LongTensor, torch.LongTensor,
+                                                                   torch.IntTensor, torch.IntTensor, torch.IntTensor,
                                                                    List[Tuple[int, int]], List[Tuple[int, int]]]:
         """
         Returns the components of the :class:`BatchMolGraph`.
@@ -261,8 +284,8 @@ class BatchMolGraph:
 
         :param atom_messages: Whether to use atom messages instead of bond messages. This changes the bond feature
                               vector to contain only bond features rather than both atom and bond features.
-        :return: A tuple containing PyTorch tensors with the atom features, bond features, graph structure,
-                 and scope of the atoms and bonds (i.e., the indices of the molecules they belong to).
+        :return: A tuple containing PyTorch tensors with the atom features, bond features, graph structure
+                 (as int32 tensors), and scope of the atoms and bonds (i.e., the indices of the molecules they belong to).
         """
         if atom_messages:
             f_bonds = self.f_bonds[:, :get_bond_fdim(atom_messages=atom_messages)]
@@ -271,6 +294,48 @@ class BatchMolGraph:
 
         return self.f_atoms, f_bonds, self.a2b, self.b2a, self.b2revb, self.a_scope, self.b_scope
 
+    def pin_memory(self) -> 'BatchMolGraph':
+        """
+        Pins the tensors of the :class:`BatchMolGraph` in page-locked memory to enable asynchronous copies to the GPU.
+
+        :return: The :class:`BatchMolGraph` (self).
+        """
+        self.f_atoms = self.f_atoms.pin_memory()
+        self.f_bonds = self.f_bonds.pin_memory()
+        self.a2b = self.a2b.pin_memory()
+        self.b2a = self.b2a.pin_memory()
+        self.b2revb = self.b2revb.pin_memory()
+
+        return self
+
+    def to(self, device: torch.device, non_blocking: bool = False) -> 'BatchMolGraph':
+        """
+        Moves the tensors of the :class:`BatchMolGraph` to a device.
+
+        :param device: The device to move the tensors to.
+        :param non_blocking: Whether to copy asynchronously with respect to the host (requires pinned memory).
+        :return: The :class:`BatchMolGraph` (self).
+        """
+        self.f_atoms = self.f_atoms.to(device, non_blocking=non_blocking)
+        self.f_bonds = self.f_bonds.to(device, non_blocking=non_blocking)
+        self.a2b = self.a2b.to(device, non_blocking=non_blocking)
+        self.b2a = self.b2a.to(device, non_blocking=non_blocking)
+        self.b2revb = self.b2revb.to(device, non_blocking=non_blocking)
+
+        return self
+
+    def record_stream(self, stream: torch.cuda.Stream) -> None:
+        """
+        Marks the (CUDA) tensors of the :class:`BatchMolGraph` as in use by a stream.
+
+        This prevents the CUDA caching allocator from reusing their memory before the stream is done with them
+        when the tensors were allocated on a different stream.
+
+        :param stream: The CUDA stream which uses the tensors.
+        """
+        for tensor in (self.f_atoms, self.f_bonds, self.a2b, self.b2a, self.b2revb):
+            tensor.record_stream(stream)
+
     def get_b2b(self) -> torch.LongTensor:
         """
         Computes (if necessary) and returns a mapping from each bond index to all the incoming bond indices.
@@ -278,14 +343,14 @@ class BatchMolGraph:
         :return: A PyTorch tensor containing the mapping from each bond index to all the incoming bond indices.
         """
         if self.b2b is None:
-            b2b = self.a2b[self.b2a]  # num_bonds x max_num_bonds
+            b2b = self.a2b[self.b2a.long()]  # num_bonds x max_num_bonds
             # b2b includes reverse edge for each bond so need to mask out
             revmask = (b2b != self.b2revb.unsqueeze(1).repeat(1, b2b.size(1))).long()  # num_bonds x max_num_bonds
             self.b2b = b2b * revmask
 
         return self.b2b
 
-    def get_a2a(self) -> torch.LongTensor:
+    def get_a2a(self) -> torch.IntTensor:
         """
         Computes (if necessary) and returns a mapping from each atom index to all neighboring atom indices.
 
@@ -296,7 +361,7 @@ class BatchMolGraph:
             # a2b maps a2 to all incoming bonds b
             # b2a maps each bond b to the atom it comes from a1
             # thus b2a[a2b] maps atom a2 to neighboring atoms a1
-            self.a2a = self.b2a[self.a2b]  # num_atoms x max_num_bonds
+            self.a2a = self.b2a[self.a2b.long()]  # num_atoms x max_num_bonds
 
         return self.a2a
 
@@ -91,10 +91,12 @@ class MPNEncoder(nn.Module):
             atom_descriptors_batch = torch.from_numpy(np.concatenate(atom_descriptors_batch, axis=0)).float().to(self.device)
 
         f_atoms, f_bonds, a2b, b2a, b2revb, a_scope, b_scope = mol_graph.get_components(atom_messages=self.atom_messages)
-        f_atoms, f_bonds, a2b, b2a, b2revb = f_atoms.to(self.device), f_bonds.to(self.device), a2b.to(self.device), b2a.to(self.device), b2revb.to(self.device)
+        f_atoms, f_bonds = f_atoms.to(self.device, non_blocking=True), f_bonds.to(self.device, non_blocking=True)
+        # The int32 indices are widened to int64 (required for indexing) only after they are on the device
+        a2b, b2a, b2revb = (x.to(self.device, non_blocking=True).long() for x in (a2b, b2a, b2revb))
 
         if self.atom_messages:
-            a2a = mol_graph.get_a2a().to(self.device)
+            a2a = b2a[a2b]  # num_atoms x max_num_bonds (derived on the device rather than copied from the host)
 
         # Input
         if self.atom_messages:
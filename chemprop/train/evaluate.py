@@ -1,6 +1,8 @@
 from collections import defaultdict
 import logging
-from typing import Callable, Dict, List
+from typing import Callable, Dict, List, Optional, Union
+
+import numpy as np
 
 from .predict import predict
 from chemprop.data import MoleculeDataLoader, StandardScaler
@@ -8,8 +10,8 @@ from chemprop.models import MoleculeModel
 from chemprop.utils import get_metric_func
 
 
-def evaluate_predictions(preds: List[List[float]],
-                         targets: List[List[float]],
+def evaluate_predictions(preds: Union[List[List[float]], np.ndarray],
+                         targets: Union[List[List[Optional[float]]], np.ndarray],
                          num_tasks: int,
                          metrics: List[str],
                          dataset_type: str,
@@ -17,8 +19,9 @@ def evaluate_predictions(preds: List[List[float]],
     """
     Evaluates predictions using a metric function after filtering out invalid targets.
 
-    :param preds: A list of lists of shape :code:`(data_size, num_tasks)` with model predictions.
-    :param targets: A list of lists of shape :code:`(data_size, num_tasks)` with targets.
+    :param preds: A list of lists or an array of shape :code:`(data_size, num_tasks)` with model predictions.
+    :param targets: A list of lists or an array of shape :code:`(data_size, num_tasks)` with targets
+                    (None or NaN for unknown targets).
     :param num_tasks: Number of tasks.
     :param metrics: A list of names of metric functions.
     :param dataset_type: Dataset type.
@@ -32,26 +35,24 @@ def evaluate_predictions(preds: List[List[float]],
     if len(preds) == 0:
         return {metric: [float('nan')] * num_tasks for metric in metrics}
 
-    # Filter out empty targets
-    # valid_preds and valid_targets have shape (num_tasks, data_size)
-    valid_preds = [[] for _ in range(num_tasks)]
-    valid_targets = [[] for _ in range(num_tasks)]
-    for i in range(num_tasks):
-        for j in range(len(preds)):
-            if targets[j][i] is not None:  # Skip those without targets
-                valid_preds[i].append(preds[j][i])
-                valid_targets[i].append(targets[j][i])
+    preds = np.asarray(preds, dtype=float)
+    targets = np.asarray(targets, dtype=float)  # None --> NaN
+    valid_mask = ~np.isnan(targets)
 
     # Compute metric
     results = defaultdict(list)
     for i in range(num_tasks):
+        # Filter out empty targets
+        valid_preds = preds[valid_mask[:, i], i]
+        valid_targets = targets[valid_mask[:, i], i]
+
         # # Skip if all targets or preds are identical, otherwise we'll crash during classification
         if dataset_type == 'classification':
             nan = False
-            if all(target == 0 for target in valid_targets[i]) or all(target == 1 for target in valid_targets[i]):
+            if np.all(valid_targets == 0) or np.all(valid_targets == 1):
                 nan = True
                 info('Warning: Found a task with targets all 0s or all 1s')
-            if all(pred == 0 for pred in valid_preds[i]) or all(pred == 1 for pred in valid_preds[i]):
+            if np.all(valid_preds == 0) or np.all(valid_preds == 1):
                 nan = True
                 info('Warning: Found a task with predictions all 0s or all 1s')
 
@@ -60,15 +61,15 @@ def evaluate_predictions(preds: List[List[float]],
                     results[metric].append(float('nan'))
                 continue
 
-        if len(valid_targets[i]) == 0:
+        if len(valid_targets) == 0:
             continue
 
         for metric, metric_func in metric_to_func.items():
             if dataset_type == 'multiclass':
-                results[metric].append(metric_func(valid_targets[i], valid_preds[i],
-                                                   labels=list(range(len(valid_preds[i][0])))))
+                results[metric].append(metric_func(valid_targets, valid_preds,
+                                                   labels=list(range(valid_preds.shape[1]))))
             else:
-                results[metric].append(metric_func(valid_targets[i], valid_preds[i]))
+                results[metric].append(metric_func(valid_targets, valid_preds))
 
     results = dict(results)
 
@@ -103,7 +104,7 @@ def evaluate(model: MoleculeModel,
 
     results = evaluate_predictions(
         preds=preds,
-        targets=data_loader.targets,
+        targets=data_loader.targets_array,
         num_tasks=num_tasks,
         metrics=metrics,
         dataset_type=dataset_type,
@@ -89,7 +89,10 @@ def make_predictions(args: PredictArgs, smiles: List[str] = None) -> List[List[O
     test_data_loader = MoleculeDataLoader(
         dataset=test_data,
         batch_size=args.batch_size,
-        num_workers=args.num_workers
+        num_workers=args.num_workers,
+        pin_memory=args.pin_memory,
+        persistent_workers=args.persistent_workers,
+        prefetch_to_device=args.device if args.cuda else None
     )
 
     print(f'Predicting with an ensemble of {len(args.checkpoint_paths)} models')
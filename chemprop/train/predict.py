@@ -29,18 +29,20 @@ def predict(model: MoleculeModel,
         batch: MoleculeDataset
         mol_batch, features_batch, atom_descriptors_batch = batch.batch_graph(), batch.features(), batch.atom_descriptors()
 
-        # Make predictions
+        # Make predictions (kept on the device until all batches are done to avoid a host sync per batch)
         with torch.no_grad():
             batch_preds = model(mol_batch, features_batch, atom_descriptors_batch)
 
-        batch_preds = batch_preds.data.cpu().numpy()
+        preds.append(batch_preds)
 
-        # Inverse scale if regression
-        if scaler is not None:
-            batch_preds = scaler.inverse_transform(batch_preds)
+    if len(preds) == 0:
+        return []
 
-        # Collect vectors
-        batch_preds = batch_preds.tolist()
-        preds.extend(batch_preds)
+    # Collect vectors
+    preds = torch.cat(preds, dim=0).cpu().numpy()
 
-    return preds
+    # Inverse scale if regression
+    if scaler is not None:
+        preds = scaler.inverse_transform(preds)
+
+    return preds.tolist()
@@ -14,7 +14,8 @@ from .predict import predict
 from .train import train
 from chemprop.args import TrainArgs
 from chemprop.constants import MODEL_FILE_NAME
-from chemprop.data import get_class_sizes, get_data, MoleculeDataLoader, MoleculeDataset, set_cache_graph, split_data
+from chemprop.data import cache_graphs, get_class_sizes, get_data, MoleculeDataLoader, MoleculeDataset, set_cache_graph, \
+    split_data
 from chemprop.models import MoleculeModel
 from chemprop.nn_utils import param_count
 from chemprop.utils import build_optimizer, build_lr_scheduler, get_loss_func, load_checkpoint,makedirs, \
@@ -99,13 +100,13 @@ def run_training(args: TrainArgs,
 
     # Set up test set evaluation (or val set evaluation if doing hyperoptimization)
     if args.num_iters:
-        val_smiles, val_targets = val_data.smiles(), val_data.targets()
+        val_smiles, val_targets = val_data.smiles(), val_data.targets_array()
         if args.dataset_type == 'multiclass':
             sum_val_preds = np.zeros((len(val_smiles), args.num_tasks, args.multiclass_num_classes))
         else:
             sum_val_preds = np.zeros((len(val_smiles), args.num_tasks))
     else:
-        test_smiles, test_targets = test_data.smiles(), test_data.targets()
+        test_smiles, test_targets = test_data.smiles(), test_data.targets_array()
         if args.dataset_type == 'multiclass':
             sum_test_preds = np.zeros((len(test_smiles), args.num_tasks, args.multiclass_num_classes))
         else:
@@ -115,6 +116,9 @@ def run_training(args: TrainArgs,
     if len(data) <= args.cache_cutoff:
         set_cache_graph(True)
         num_workers = 0
+
+        # Featurize the molecules in parallel up front rather than sequentially during the first epoch
+        cache_graphs([train_data, val_data, test_data], num_workers=args.num_workers)
     else:
         set_cache_graph(False)
         num_workers = args.num_workers
@@ -126,17 +130,26 @@ def run_training(args: TrainArgs,
         num_workers=num_workers,
         class_balance=args.class_balance,
         shuffle=True,
-        seed=args.seed
+        seed=args.seed,
+        pin_memory=args.pin_memory,
+        persistent_workers=args.persistent_workers,
+        prefetch_to_device=args.device if args.cuda else None
     )
     val_data_loader = MoleculeDataLoader(
         dataset=val_data,
         batch_size=args.batch_size,
-        num_workers=num_workers
+        num_workers=num_workers,
+        pin_memory=args.pin_memory,
+        persistent_workers=args.persistent_workers,
+        prefetch_to_device=args.device if args.cuda else None
     )
     test_data_loader = MoleculeDataLoader(
         dataset=test_data,
         batch_size=args.batch_size,
-        num_workers=num_workers
+        num_workers=num_workers,
+        pin_memory=args.pin_memory,
+        persistent_workers=args.persistent_workers,
+        prefetch_to_device=args.device if args.cuda else None
     )
 
     if args.class_balance:
@@ -291,7 +304,7 @@ def run_training(args: TrainArgs,
 
     # Evaluate ensemble on test set
     if args.num_iters:
-        avg_val_preds = (sum_val_preds / args.ensemble_size).tolist()
+        avg_val_preds = sum_val_preds / args.ensemble_size
         
         ensemble_scores = evaluate_predictions(
             preds=avg_val_preds,
@@ -312,7 +325,7 @@ def run_training(args: TrainArgs,
                 for task_name, ensemble_score in zip(args.task_names, scores):
                     info(f'Ensemble validation {task_name} {metric} = {ensemble_score:.6f}')
     else:
-        avg_test_preds = (sum_test_preds / args.ensemble_size).tolist()
+        avg_test_preds = sum_test_preds / args.ensemble_size
     
         ensemble_scores = evaluate_predictions(
             preds=avg_test_preds,
@@ -338,7 +351,7 @@ def run_training(args: TrainArgs,
             test_preds_dataframe = pd.DataFrame(data={'smiles': test_data.smiles()})
     
             for i, task_name in enumerate(args.task_names):
-                test_preds_dataframe[task_name] = [pred[i] for pred in avg_test_preds]
+                test_preds_dataframe[task_name] = avg_test_preds[:, i].tolist()
     
             test_preds_dataframe.to_csv(os.path.join(args.save_dir, 'test_preds.csv'), index=False)
 
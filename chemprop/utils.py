@@ -9,6 +9,7 @@ import pickle
 from time import time
 from typing import Any, Callable, List, Tuple, Union
 
+import numpy as np
 from sklearn.metrics import auc, mean_absolute_error, mean_squared_error, precision_recall_curve, r2_score,\
     roc_auc_score, accuracy_score, log_loss
 import torch
@@ -220,7 +221,7 @@ def mse(targets: List[float], preds: List[float]) -> float:
     return mean_squared_error(targets, preds)
 
 
-def accuracy(targets: List[int], preds: Union[List[float], List[List[float]]], threshold: float = 0.5) -> float:
+def accuracy(targets: List[int], preds: Union[List[float], List[List[float]], np.ndarray], threshold: float = 0.5) -> float:
     """
     Computes the accuracy of a binary prediction task using a given threshold for generating hard predictions.
 
@@ -231,10 +232,11 @@ def accuracy(targets: List[int], preds: Union[List[float], List[List[float]]], t
     :param threshold: The threshold above which a prediction is a 1 and below which (inclusive) a prediction is a 0.
     :return: The computed accuracy.
     """
-    if type(preds[0]) == list:  # multiclass
-        hard_preds = [p.index(max(p)) for p in preds]
+    preds = np.asarray(preds)
+    if preds.ndim == 2:  # multiclass
+        hard_preds = preds.argmax(axis=1)
     else:
-        hard_preds = [1 if p > threshold else 0 for p in preds]  # binary prediction
+        hard_preds = (preds > threshold).astype(int)  # binary prediction
 
     return accuracy_score(targets, hard_preds)
 
@@ -443,10 +445,7 @@ def save_smiles_splits(data_path: str,
             for smiles in dataset.smiles():
                 writer.writerow(lines_by_smiles[smiles])
 
-        split_indices = []
-        for smiles in dataset.smiles():
-            split_indices.append(indices_by_smiles[smiles])
-            split_indices = sorted(split_indices)
+        split_indices = sorted(indices_by_smiles[smiles] for smiles in dataset.smiles())
         all_split_indices.append(split_indices)
 
     with open(os.path.join(save_dir, 'split_indices.pckl'), 'wb') as f:
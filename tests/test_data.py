@@ -0,0 +1,78 @@
+"""Chemprop data loading tests."""
+import unittest
+from unittest import TestCase
+
+import torch
+
+from chemprop.data import get_data, MoleculeDataLoader
+
+
+TEST_DATA_PATH = 'tests/data/regression.csv'
+BATCH_SIZE = 10
+
+
+def failing_collate(data):
+    raise RuntimeError('collate failed')
+
+
+class PrefetchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.data = get_data(path=TEST_DATA_PATH, max_data_size=200)
+
+    def create_loader(self, num_workers: int = 0) -> MoleculeDataLoader:
+        return MoleculeDataLoader(
+            dataset=self.data,
+            batch_size=BATCH_SIZE,
+            num_workers=num_workers,
+            prefetch_to_device=torch.device('cpu')
+        )
+
+    def check_epoch(self, loader: MoleculeDataLoader):
+        smiles = [s for batch in loader for s in batch.smiles()]
+        self.assertEqual(smiles, self.data.smiles())
+
+    def test_full_iteration(self):
+        loader = self.create_loader()
+        batches = list(loader)
+
+        self.assertEqual(len(batches), len(self.data) // BATCH_SIZE)
+        self.assertEqual([s for batch in batches for s in batch.smiles()], self.data.smiles())
+        for batch in batches:
+            self.assertEqual(batch.batch_graph().f_atoms.device.type, 'cpu')
+
+    def test_early_break(self):
+        loader = self.create_loader()
+
+        for _ in range(2):
+            for batch in loader:
+                break
+
+        self.check_epoch(loader)
+
+    def test_early_break_persistent_workers(self):
+        loader = self.create_loader(num_workers=2)
+
+        # Keep the abandoned iterator alive (e.g., as if a traceback still referenced it) while starting a new epoch
+        iterator = iter(loader)
+        next(iterator)
+
+        smiles = []
+        for batch in loader:
+            smiles.extend(batch.smiles())
+            next(iterator, None)  # the abandoned iterator must not take batches from the new epoch
+
+        self.assertEqual(smiles, self.data.smiles())
+        self.check_epoch(loader)
+
+    def test_exception_is_reraised(self):
+        loader = self.create_loader()
+        loader.collate_fn = failing_collate
+
+        with self.assertRaisesRegex(RuntimeError, 'collate failed'):
+            for _ in loader:
+                pass
+
+
+if __name__ == '__main__':
+    unittest.main()
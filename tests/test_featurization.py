@@ -0,0 +1,83 @@
+"""Chemprop featurization tests."""
+from typing import List, Tuple
+import unittest
+from unittest import TestCase
+
+import numpy as np
+
+from chemprop.features import BatchMolGraph, MolGraph
+from chemprop.features._collate_numba import offset_indices_numba, offset_indices_numpy
+
+
+# Includes an empty molecule, single-atom molecules and molecules of varying degree
+SMILES = ['CCO', '', 'C', 'c1ccccc1O', '[Na+]', 'CC(C)(C)C(=O)N', 'O', 'C1CC1C#N']
+
+
+def reference_batch(mol_graphs: List[MolGraph], max_num_bonds: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Builds a2b, b2a and b2revb of a batch with the original list-based :class:`BatchMolGraph` algorithm."""
+    n_atoms, n_bonds = 1, 1
+    a2b, b2a, b2revb = [[]], [0], [0]
+    for mol_graph in mol_graphs:
+        for a in range(mol_graph.n_atoms):
+            a2b.append([b + n_bonds for b in mol_graph.a2b[a, :mol_graph.degrees[a]]])
+        for b in range(mol_graph.n_bonds):
+            b2a.append(n_atoms + mol_graph.b2a[b])
+            b2revb.append(n_bonds + mol_graph.b2revb[b])
+        n_atoms += mol_graph.n_atoms
+        n_bonds += mol_graph.n_bonds
+
+    a2b = [in_bonds + [0] * (max_num_bonds - len(in_bonds)) for in_bonds in a2b]
+
+    return np.array(a2b), np.array(b2a), np.array(b2revb)
+
+
+def unshifted_batch(mol_graphs: List[MolGraph], max_num_bonds: int) -> Tuple[np.ndarray, ...]:
+    """Concatenates the per-molecule indices of a batch without shifting them (the input of the offset kernel)."""
+    n_atoms = 1 + sum(mol_graph.n_atoms for mol_graph in mol_graphs)
+    a2b = np.zeros((n_atoms, max_num_bonds), dtype=np.int32)
+    a_start = 1
+    for mol_graph in mol_graphs:
+        a2b[a_start:a_start + mol_graph.n_atoms, :mol_graph.a2b.shape[1]] = mol_graph.a2b
+        a_start += mol_graph.n_atoms
+
+    degrees = np.concatenate([np.zeros(1, dtype=np.int32)] + [mol_graph.degrees for mol_graph in mol_graphs])
+    b2a = np.concatenate([np.zeros(1, dtype=np.int32)] + [mol_graph.b2a for mol_graph in mol_graphs])
+    b2revb = np.concatenate([np.zeros(1, dtype=np.int32)] + [mol_graph.b2revb for mol_graph in mol_graphs])
+    mol_n_atoms = np.array([mol_graph.n_atoms for mol_graph in mol_graphs], dtype=np.int64)
+    mol_n_bonds = np.array([mol_graph.n_bonds for mol_graph in mol_graphs], dtype=np.int64)
+
+    return a2b, degrees, b2a, b2revb, mol_n_atoms, mol_n_bonds
+
+
+class OffsetIndicesTests(TestCase):
+    def setUp(self):
+        self.mol_graphs = [MolGraph(smiles) for smiles in SMILES]
+        self.max_num_bonds = max(mol_graph.a2b.shape[1] for mol_graph in self.mol_graphs)  # atoms of lower degree are padded
+
+    def check_offset_indices(self, offset_indices):
+        a2b, degrees, b2a, b2revb, mol_n_atoms, mol_n_bonds = unshifted_batch(self.mol_graphs, self.max_num_bonds)
+        offset_indices(a2b, degrees, b2a, b2revb, mol_n_atoms, mol_n_bonds)
+
+        ref_a2b, ref_b2a, ref_b2revb = reference_batch(self.mol_graphs, self.max_num_bonds)
+        np.testing.assert_array_equal(a2b, ref_a2b)
+        np.testing.assert_array_equal(b2a, ref_b2a)
+        np.testing.assert_array_equal(b2revb, ref_b2revb)
+
+    def test_numpy(self):
+        self.check_offset_indices(offset_indices_numpy)
+
+    @unittest.skipIf(offset_indices_numba is None, 'numba is not installed')
+    def test_numba(self):
+        self.check_offset_indices(offset_indices_numba)
+
+    def test_batch_mol_graph(self):
+        batch = BatchMolGraph(self.mol_graphs)
+
+        ref_a2b, ref_b2a, ref_b2revb = reference_batch(self.mol_graphs, self.max_num_bonds)
+        np.testing.assert_array_equal(batch.a2b.numpy(), ref_a2b)
+        np.testing.assert_array_equal(batch.b2a.numpy(), ref_b2a)
+        np.testing.assert_array_equal(batch.b2revb.numpy(), ref_b2revb)
+
+
+if __name__ == '__main__':
+    unittest.main()